@@ -0,0 +1,169 @@
+# Daily analytics rollups for the admin area
+#
+# Rollup tables are kept current by triggers on the source tables, so every
+# writer (web routes, lead imports, scripts) updates them in the same
+# transaction. rebuild_rollups() recomputes them from scratch if needed.
+import sqlite3
+
+MAX_ANALYTICS_DAYS = 3650
+
+ROLLUP_SCHEMA = '''
+    CREATE TABLE IF NOT EXISTS daily_leads (
+        day TEXT NOT NULL,
+        mode TEXT NOT NULL,
+        leads INTEGER NOT NULL DEFAULT 0,
+        PRIMARY KEY (day, mode)
+    );
+
+    CREATE TABLE IF NOT EXISTS daily_course_stats (
+        day TEXT NOT NULL,
+        course_id INTEGER NOT NULL,
+        enrollments INTEGER NOT NULL DEFAULT 0,
+        completions INTEGER NOT NULL DEFAULT 0,
+        PRIMARY KEY (day, course_id)
+    );
+    CREATE INDEX IF NOT EXISTS idx_daily_course_stats_course ON daily_course_stats(course_id);
+
+    CREATE TRIGGER IF NOT EXISTS trg_students_rollup_insert AFTER INSERT ON students
+    BEGIN
+        INSERT INTO daily_leads (day, mode, leads)
+        VALUES (COALESCE(date(NEW.created_at), date('now')), NEW.mode, 1)
+        ON CONFLICT(day, mode) DO UPDATE SET leads = leads + 1;
+    END;
+
+    CREATE TRIGGER IF NOT EXISTS trg_students_rollup_delete AFTER DELETE ON students
+    BEGIN
+        UPDATE daily_leads SET leads = leads - 1
+        WHERE day = COALESCE(date(OLD.created_at), date('now')) AND mode = OLD.mode;
+    END;
+
+    CREATE TRIGGER IF NOT EXISTS trg_students_rollup_update AFTER UPDATE OF created_at, mode ON students
+    WHEN COALESCE(date(OLD.created_at), '') != COALESCE(date(NEW.created_at), '') OR OLD.mode != NEW.mode
+    BEGIN
+        UPDATE daily_leads SET leads = leads - 1
+        WHERE day = COALESCE(date(OLD.created_at), date('now')) AND mode = OLD.mode;
+        INSERT INTO daily_leads (day, mode, leads)
+        VALUES (COALESCE(date(NEW.created_at), date('now')), NEW.mode, 1)
+        ON CONFLICT(day, mode) DO UPDATE SET leads = leads + 1;
+    END;
+
+    CREATE TRIGGER IF NOT EXISTS trg_enrollments_rollup_insert AFTER INSERT ON enrollments
+    BEGIN
+        INSERT INTO daily_course_stats (day, course_id, enrollments)
+        VALUES (COALESCE(date(NEW.enrolled_at), date('now')), NEW.course_id, 1)
+        ON CONFLICT(day, course_id) DO UPDATE SET enrollments = enrollments + 1;
+    END;
+
+    CREATE TRIGGER IF NOT EXISTS trg_progress_rollup_complete AFTER UPDATE OF completed ON course_progress
+    WHEN NEW.completed = 1 AND COALESCE(OLD.completed, 0) = 0
+    BEGIN
+        INSERT INTO daily_course_stats (day, course_id, completions)
+        VALUES (COALESCE(date(NEW.completed_at), date('now')), NEW.course_id, 1)
+        ON CONFLICT(day, course_id) DO UPDATE SET completions = completions + 1;
+    END;
+
+    CREATE TRIGGER IF NOT EXISTS trg_progress_rollup_uncomplete AFTER UPDATE OF completed ON course_progress
+    WHEN OLD.completed = 1 AND COALESCE(NEW.completed, 0) = 0
+    BEGIN
+        UPDATE daily_course_stats SET completions = completions - 1
+        WHERE day = COALESCE(date(OLD.completed_at), date('now')) AND course_id = OLD.course_id;
+    END;
+'''
+
+
+def ensure_analytics_schema(conn):
+    """Create rollup tables and triggers; backfill them the first time"""
+    cursor = conn.cursor()
+    cursor.execute("SELECT name FROM sqlite_master WHERE type = 'table' AND name = 'daily_leads'")
+    first_run = cursor.fetchone() is None
+    conn.executescript(ROLLUP_SCHEMA)
+    if first_run:
+        rebuild_rollups(conn)
+    conn.commit()
+
+
+def rebuild_rollups(conn):
+    """Recompute all rollups from the source tables (one full scan)"""
+    cursor = conn.cursor()
+    cursor.execute('DELETE FROM daily_leads')
+    cursor.execute('DELETE FROM daily_course_stats')
+    cursor.execute('''
+        INSERT INTO daily_leads (day, mode, leads)
+        SELECT COALESCE(date(created_at), date('now')), mode, COUNT(*)
+        FROM students GROUP BY 1, 2
+    ''')
+    cursor.execute('''
+        INSERT INTO daily_course_stats (day, course_id, enrollments)
+        SELECT COALESCE(date(enrolled_at), date('now')), course_id, COUNT(*)
+        FROM enrollments GROUP BY 1, 2
+    ''')
+    cursor.execute('''
+        INSERT INTO daily_course_stats (day, course_id, completions)
+        SELECT COALESCE(date(completed_at), date('now')), course_id, COUNT(*)
+        FROM course_progress WHERE completed = 1 GROUP BY 1, 2
+        ON CONFLICT(day, course_id) DO UPDATE SET completions = excluded.completions
+    ''')
+
+
+def clamp_days(days):
+    """Keep the analytics window within 1..MAX_ANALYTICS_DAYS days"""
+    return min(max(int(days), 1), MAX_ANALYTICS_DAYS)
+
+
+def get_analytics(conn, days=30):
+    """Read the admin analytics figures from the rollup tables only"""
+    conn.row_factory = sqlite3.Row
+    cursor = conn.cursor()
+    since = f'-{clamp_days(days)} days'
+
+    cursor.execute('''
+        SELECT day, SUM(leads) AS leads FROM daily_leads
+        WHERE day >= date('now', ?) GROUP BY day ORDER BY day DESC
+    ''', (since,))
+    leads_per_day = cursor.fetchall()
+
+    cursor.execute('''
+        SELECT mode, SUM(leads) AS leads FROM daily_leads
+        WHERE day >= date('now', ?) GROUP BY mode ORDER BY leads DESC
+    ''', (since,))
+    leads_by_mode = cursor.fetchall()
+
+    # courses is the small catalog table; the join only adds titles and tracks
+    cursor.execute('''
+        SELECT c.id, c.title, c.track, c.total_modules,
+               COALESCE(SUM(s.enrollments), 0) AS enrollments,
+               COALESCE(SUM(s.completions), 0) AS completions
+        FROM courses c
+        LEFT JOIN daily_course_stats s ON s.course_id = c.id
+        GROUP BY c.id
+        ORDER BY c.track, c.order_index
+    ''')
+    per_course = [dict(row) for row in cursor.fetchall()]
+
+    per_track = {}
+    for course in per_course:
+        possible = course['enrollments'] * course['total_modules']
+        course['completion_rate'] = round(100 * course['completions'] / possible) if possible else 0
+        track = per_track.setdefault(course['track'], {'track': course['track'], 'enrollments': 0,
+                                                       'completions': 0, 'possible': 0})
+        track['enrollments'] += course['enrollments']
+        track['completions'] += course['completions']
+        track['possible'] += possible
+    for track in per_track.values():
+        track['completion_rate'] = round(100 * track['completions'] / track['possible']) if track['possible'] else 0
+
+    return {
+        'leads_per_day': leads_per_day,
+        'leads_by_mode': leads_by_mode,
+        'per_course': per_course,
+        'per_track': list(per_track.values()),
+    }
+
+
+if __name__ == '__main__':
+    from main import DB_NAME
+
+    with sqlite3.connect(DB_NAME) as conn:
+        rebuild_rollups(conn)
+        conn.commit()
+    print("Rollups rebuilt.")
@@ -0,0 +1,90 @@
+# Benchmark streamed vs buffered rendering of the admin dashboard
+#
+# Builds a throwaway database with many leads, then compares time to first
+# byte, total time and peak Python memory of the streamed /admin page against
+# the old fetchall() + render_template() version of the same page.
+import os
+import sys
+import sqlite3
+import tempfile
+import time
+import tracemalloc
+
+STUDENTS = int(sys.argv[1]) if len(sys.argv) > 1 else 200000
+
+os.environ['DB_FOLDER'] = tempfile.mkdtemp(prefix='houshdan-bench-')
+os.environ['MAINTENANCE_INTERVAL'] = '0'
+
+from flask import render_template, session, redirect, url_for  # noqa: E402
+import main  # noqa: E402
+from snapshot import connect_snapshot, take_snapshot  # noqa: E402
+
+
+def fill_students(db_name, count):
+    with sqlite3.connect(db_name) as conn:
+        conn.executemany(
+            'INSERT INTO students (name, email, phone, mode, email_norm, phone_norm) VALUES (?, ?, ?, ?, ?, ?)',
+            ((f'دانشجو {i}', f'lead{i}@example.com', f'0912{i:07d}', 'online',
+              f'lead{i}@example.com', f'0912{i:07d}') for i in range(count)))
+    take_snapshot(main.DB_NAME, max_age=0)
+
+
+@main.app.route('/admin/buffered')
+def admin_dashboard_buffered():
+    # The previous implementation: every row is loaded before rendering starts
+    if not session.get('admin_logged_in'):
+        return redirect(url_for('admin_login'))
+    with connect_snapshot(main.DB_NAME) as conn:
+        conn.row_factory = sqlite3.Row
+        cursor = conn.cursor()
+        cursor.execute('SELECT * FROM students ORDER BY created_at DESC')
+        students = cursor.fetchall()
+    return render_template('admin_dashboard.html', students=students, import_job=None,
+                           snapshot_age=0, unread_messages=0)
+
+
+def measure(client, path):
+    tracemalloc.start()
+    start = time.perf_counter()
+    resp = client.get(path, buffered=False)
+    chunks = iter(resp.response)
+    first = next(chunks)
+    ttfb = time.perf_counter() - start
+    size = len(first) + sum(len(chunk) for chunk in chunks)
+    total = time.perf_counter() - start
+    resp.close()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return resp.status_code, ttfb, total, peak, size
+
+
+def bench():
+    print(f"Filling {STUDENTS} students in {os.environ['DB_FOLDER']}...")
+    fill_students(main.DB_NAME, STUDENTS)
+
+    with main.app.test_client() as client:
+        with client.session_transaction() as sess:
+            sess['admin_logged_in'] = True
+        measure(client, '/admin')  # warm template cache
+
+        results = {}
+        for label, path in (('buffered', '/admin/buffered'), ('streamed', '/admin')):
+            status, ttfb, total, peak, size = measure(client, path)
+            if status != 200:
+                print(f"FAILURE: {path} returned {status}.")
+                return
+            results[label] = (ttfb, peak, size)
+            print(f" - {label}: TTFB {ttfb * 1000:.1f} ms, total {total * 1000:.1f} ms, "
+                  f"peak memory {peak / 1024 / 1024:.1f} MiB, body {size / 1024 / 1024:.1f} MiB")
+
+    buffered, streamed = results['buffered'], results['streamed']
+    if streamed[2] != buffered[2]:
+        print("FAILURE: Streamed and buffered pages differ in size.")
+    elif streamed[0] < buffered[0] and streamed[1] < buffered[1]:
+        print(f"SUCCESS: Streaming cut TTFB {buffered[0] / streamed[0]:.0f}x "
+              f"and peak memory {buffered[1] / streamed[1]:.0f}x.")
+    else:
+        print("FAILURE: Streaming did not improve TTFB and peak memory.")
+
+if __name__ == "__main__":
+    bench()
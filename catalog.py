@@ -0,0 +1,236 @@
+# Course catalog: typed (Jalali/Gregorian) start dates and a precomputed display cache
+#
+# Course start dates are stored as YYYYMMDD integers in both calendars. Display
+# strings and Persian-digit prices are built once per catalog version; the
+# version is bumped by triggers on courses/specializations, so each request
+# only pays a single-row lookup to know the cache is still valid. The text
+# start_date is authoritative; the typed columns are re-derived from it
+# whenever the version changes.
+import sqlite3
+import threading
+
+JALALI_MONTHS = ['فروردین', 'اردیبهشت', 'خرداد', 'تیر', 'مرداد', 'شهریور',
+                 'مهر', 'آبان', 'آذر', 'دی', 'بهمن', 'اسفند']
+
+TO_PERSIAN_DIGITS = str.maketrans('0123456789', '۰۱۲۳۴۵۶۷۸۹')
+FROM_PERSIAN_DIGITS = str.maketrans('۰۱۲۳۴۵۶۷۸۹٠١٢٣٤٥٦٧٨٩', '01234567890123456789')
+
+COMING_SOON = 'بزودی'
+
+_catalog = None
+_catalog_lock = threading.Lock()
+
+
+def gregorian_to_jalali(gy, gm, gd):
+    g_d_m = [0, 31, 59, 90, 120, 151, 181, 212, 243, 273, 304, 334]
+    gy2 = gy + 1 if gm > 2 else gy
+    days = 355666 + 365 * gy + (gy2 + 3) // 4 - (gy2 + 99) // 100 + (gy2 + 399) // 400 + gd + g_d_m[gm - 1]
+    jy = -1595 + 33 * (days // 12053)
+    days %= 12053
+    jy += 4 * (days // 1461)
+    days %= 1461
+    if days > 365:
+        jy += (days - 1) // 365
+        days = (days - 1) % 365
+    if days < 186:
+        return jy, 1 + days // 31, 1 + days % 31
+    return jy, 7 + (days - 186) // 30, 1 + (days - 186) % 30
+
+
+def jalali_to_gregorian(jy, jm, jd):
+    jy += 1595
+    days = -355668 + 365 * jy + (jy // 33) * 8 + ((jy % 33) + 3) // 4 + jd
+    days += (jm - 1) * 31 if jm < 7 else (jm - 7) * 30 + 186
+    gy = 400 * (days // 146097)
+    days %= 146097
+    if days > 36524:
+        days -= 1
+        gy += 100 * (days // 36524)
+        days %= 36524
+        if days >= 365:
+            days += 1
+    gy += 4 * (days // 1461)
+    days %= 1461
+    if days > 365:
+        gy += (days - 1) // 365
+        days = (days - 1) % 365
+    gd = days + 1
+    leap = (gy % 4 == 0 and gy % 100 != 0) or gy % 400 == 0
+    month_days = [31, 29 if leap else 28, 31, 30, 31, 30, 31, 31, 30, 31, 30, 31]
+    gm = 1
+    for length in month_days:
+        if gd <= length:
+            break
+        gd -= length
+        gm += 1
+    return gy, gm, gd
+
+
+def to_int_date(y, m, d):
+    return y * 10000 + m * 100 + d
+
+
+def from_int_date(value):
+    return value // 10000, value // 100 % 100, value % 100
+
+
+def jalali_int_to_gregorian_int(jdate):
+    return to_int_date(*jalali_to_gregorian(*from_int_date(jdate)))
+
+
+def parse_persian_date(text):
+    """'۴ بهمن ۱۴۰۴' -> 14041104, or None if the text is not a Jalali date"""
+    if not text:
+        return None
+    parts = text.translate(FROM_PERSIAN_DIGITS).split()
+    if len(parts) != 3 or parts[1] not in JALALI_MONTHS:
+        return None
+    try:
+        return to_int_date(int(parts[2]), JALALI_MONTHS.index(parts[1]) + 1, int(parts[0]))
+    except ValueError:
+        return None
+
+
+def to_persian_digits(value):
+    return str(value).translate(TO_PERSIAN_DIGITS)
+
+
+def format_price(amount):
+    """2500000 -> '۲٬۵۰۰٬۰۰۰'"""
+    if amount is None:
+        return ''
+    return to_persian_digits('{:,}'.format(amount)).replace(',', '٬')
+
+
+def format_jalali(jdate):
+    """14041104 -> '۴ بهمن ۱۴۰۴'"""
+    if not jdate:
+        return COMING_SOON
+    jy, jm, jd = from_int_date(jdate)
+    return f"{to_persian_digits(jd)} {JALALI_MONTHS[jm - 1]} {to_persian_digits(jy)}"
+
+
+def set_course_start_date(cursor, where_sql, params, jdate):
+    """Write a Jalali start date (and its Gregorian twin and legacy text) to matching courses"""
+    cursor.execute(f'''
+        UPDATE courses SET start_date_j = ?, start_date_g = ?, start_date = ?
+        WHERE {where_sql}
+    ''', (jdate, jalali_int_to_gregorian_int(jdate), format_jalali(jdate), *params))
+
+
+def ensure_catalog_schema(conn):
+    """Typed start date columns and catalog versioning"""
+    cursor = conn.cursor()
+    cursor.execute("PRAGMA table_info(courses)")
+    columns = [column[1] for column in cursor.fetchall()]
+    if 'start_date_j' not in columns:
+        cursor.execute("ALTER TABLE courses ADD COLUMN start_date_j INTEGER")
+    if 'start_date_g' not in columns:
+        cursor.execute("ALTER TABLE courses ADD COLUMN start_date_g INTEGER")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_courses_start_date_g ON courses(start_date_g)")
+
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS catalog_meta (
+            id INTEGER PRIMARY KEY CHECK (id = 1),
+            version INTEGER NOT NULL DEFAULT 0
+        )
+    ''')
+    cursor.execute("INSERT OR IGNORE INTO catalog_meta (id, version) VALUES (1, 0)")
+    for table in ('courses', 'specializations'):
+        for event in ('INSERT', 'UPDATE', 'DELETE'):
+            cursor.execute(f'''
+                CREATE TRIGGER IF NOT EXISTS trg_{table}_catalog_{event.lower()} AFTER {event} ON {table}
+                BEGIN
+                    UPDATE catalog_meta SET version = version + 1 WHERE id = 1;
+                END
+            ''')
+    conn.commit()
+
+
+def sync_start_dates(cursor):
+    """Derive the typed columns from the text start_date, which is the source of truth.
+
+    Only rows whose typed dates disagree with their text are written; text that
+    is not a Jalali date clears them. Returns the number of courses updated.
+    """
+    cursor.execute("SELECT id, start_date, start_date_j FROM courses")
+    changed = [(jdate, jalali_int_to_gregorian_int(jdate) if jdate else None, course_id)
+               for course_id, jdate, current in
+               ((row[0], parse_persian_date(row[1]), row[2]) for row in cursor.fetchall())
+               if jdate != current]
+    cursor.executemany('UPDATE courses SET start_date_j = ?, start_date_g = ? WHERE id = ?', changed)
+    return len(changed)
+
+
+def _build_catalog(cursor):
+    cursor.execute('SELECT * FROM courses ORDER BY track, order_index')
+    courses = []
+    for course in cursor.fetchall():
+        c_dict = dict(course)
+        c_dict['formatted_price'] = format_price(course['price'])
+        c_dict['duration'] = course['duration_weeks']
+        # Free-text dates that could not be parsed are shown as written
+        c_dict['start_date'] = format_jalali(course['start_date_j']) if course['start_date_j'] else (course['start_date'] or COMING_SOON)
+        courses.append(c_dict)
+
+    tracks = []
+    cursor.execute('SELECT * FROM specializations')
+    for spec in cursor.fetchall():
+        track_courses = [c for c in courses if c['track'] == spec['track_code']]
+        tracks.append({
+            "title": spec['title'],
+            "desc": spec['description'],
+            "original_price": spec['original_price'],
+            "discounted_price": spec['discounted_price'],
+            "formatted_original": format_price(spec['original_price']),
+            "formatted_discounted": format_price(spec['discounted_price']),
+            "icon": spec['icon'],
+            "duration": spec['duration_weeks'],
+            # The start date of the track is the start date of its first course
+            "start_date": track_courses[0]['start_date'] if track_courses else COMING_SOON,
+            "courses": track_courses
+        })
+    return courses, tracks
+
+
+def get_catalog(db_name):
+    """Formatted courses and tracks, rebuilt only when the catalog version changes"""
+    global _catalog
+    with sqlite3.connect(db_name) as conn:
+        conn.row_factory = sqlite3.Row
+        cursor = conn.cursor()
+        cursor.execute('SELECT version FROM catalog_meta WHERE id = 1')
+        version = cursor.fetchone()[0]
+        catalog = _catalog
+        if catalog is not None and catalog['version'] == version:
+            return catalog
+
+        with _catalog_lock:
+            # Catalog writers only touch the text start_date; bring the typed
+            # columns in line before building (this bumps the version once)
+            if sync_start_dates(cursor):
+                conn.commit()
+                cursor.execute('SELECT version FROM catalog_meta WHERE id = 1')
+                version = cursor.fetchone()[0]
+            courses, tracks = _build_catalog(cursor)
+            _catalog = {
+                'version': version,
+                'courses': courses,
+                'tracks': tracks,
+                'by_id': {c['id']: c for c in courses},
+            }
+        return _catalog
+
+
+def courses_by_start_date(db_name, upcoming_from=None):
+    """Courses ordered by start date via the start_date_g index; optionally only from a day on"""
+    catalog = get_catalog(db_name)
+    with sqlite3.connect(db_name) as conn:
+        cursor = conn.cursor()
+        if upcoming_from is not None:
+            cursor.execute('SELECT id FROM courses WHERE start_date_g >= ? ORDER BY start_date_g',
+                           (to_int_date(upcoming_from.year, upcoming_from.month, upcoming_from.day),))
+        else:
+            cursor.execute('SELECT id FROM courses ORDER BY start_date_g IS NULL, start_date_g')
+        ids = [row[0] for row in cursor.fetchall()]
+    return [catalog['by_id'][i] for i in ids if i in catalog['by_id']]
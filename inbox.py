@@ -0,0 +1,190 @@
+# Admin inbox for contact_messages
+#
+# Listing uses keyset pagination over a (status, created_at, id) index, the
+# per-status counters are maintained by triggers instead of COUNT(*), and old
+# handled messages are moved to a cold archive table to keep the hot table small.
+import argparse
+import sqlite3
+
+STATUSES = ('unread', 'read', 'archived')
+PAGE_SIZE = 50
+MAX_BULK = 500
+MAX_ROWID = 2 ** 63 - 1
+ARCHIVE_AFTER_DAYS = 90
+
+INBOX_SCHEMA = '''
+    CREATE INDEX IF NOT EXISTS idx_contact_messages_status_created
+        ON contact_messages(status, created_at, id);
+
+    CREATE TABLE IF NOT EXISTS contact_message_counters (
+        status TEXT PRIMARY KEY,
+        count INTEGER NOT NULL DEFAULT 0
+    );
+
+    CREATE TABLE IF NOT EXISTS contact_messages_archive (
+        id INTEGER PRIMARY KEY,
+        name TEXT NOT NULL,
+        email TEXT NOT NULL,
+        subject TEXT,
+        message TEXT NOT NULL,
+        status TEXT,
+        created_at TIMESTAMP,
+        archived_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    );
+
+    CREATE TRIGGER IF NOT EXISTS trg_contact_messages_count_insert AFTER INSERT ON contact_messages
+    BEGIN
+        INSERT INTO contact_message_counters (status, count) VALUES (COALESCE(NEW.status, 'unread'), 1)
+        ON CONFLICT(status) DO UPDATE SET count = count + 1;
+    END;
+
+    CREATE TRIGGER IF NOT EXISTS trg_contact_messages_count_update AFTER UPDATE OF status ON contact_messages
+    WHEN OLD.status IS NOT NEW.status
+    BEGIN
+        UPDATE contact_message_counters SET count = count - 1 WHERE status = COALESCE(OLD.status, 'unread');
+        INSERT INTO contact_message_counters (status, count) VALUES (COALESCE(NEW.status, 'unread'), 1)
+        ON CONFLICT(status) DO UPDATE SET count = count + 1;
+    END;
+
+    CREATE TRIGGER IF NOT EXISTS trg_contact_messages_count_delete AFTER DELETE ON contact_messages
+    BEGIN
+        UPDATE contact_message_counters SET count = count - 1 WHERE status = COALESCE(OLD.status, 'unread');
+    END;
+'''
+
+
+def ensure_inbox_schema(conn):
+    """Create the inbox index, counters (backfilled once) and the archive table"""
+    cursor = conn.cursor()
+    cursor.execute("SELECT name FROM sqlite_master WHERE type = 'table' AND name = 'contact_message_counters'")
+    first_run = cursor.fetchone() is None
+    conn.executescript(INBOX_SCHEMA)
+    if first_run:
+        cursor.execute('''
+            INSERT INTO contact_message_counters (status, count)
+            SELECT COALESCE(status, 'unread'), COUNT(*) FROM contact_messages GROUP BY 1
+        ''')
+    conn.commit()
+
+
+def get_counters(conn):
+    cursor = conn.cursor()
+    cursor.execute('SELECT status, count FROM contact_message_counters')
+    counters = {status: 0 for status in STATUSES}
+    counters.update({row[0]: row[1] for row in cursor.fetchall()})
+    return counters
+
+
+def encode_cursor(message):
+    return f"{message['created_at']}|{message['id']}"
+
+
+def decode_cursor(value):
+    """'created_at|id' -> (created_at, id), or None if malformed"""
+    if not value or '|' not in value:
+        return None
+    created_at, _, message_id = value.rpartition('|')
+    try:
+        return created_at, int(message_id)
+    except ValueError:
+        return None
+
+
+def list_messages(conn, status, after=None, limit=PAGE_SIZE):
+    """One page of messages with the given status, newest first.
+
+    Returns (messages, next_cursor); pass next_cursor back as after= for the
+    following page. The (created_at, id) row-value comparison is answered from
+    the status index, so deep pages cost the same as the first one.
+    """
+    conn.row_factory = sqlite3.Row
+    cursor = conn.cursor()
+    position = decode_cursor(after)
+    if position:
+        cursor.execute('''
+            SELECT * FROM contact_messages
+            WHERE status = ? AND (created_at, id) < (?, ?)
+            ORDER BY created_at DESC, id DESC LIMIT ?
+        ''', (status, *position, limit + 1))
+    else:
+        cursor.execute('''
+            SELECT * FROM contact_messages
+            WHERE status = ?
+            ORDER BY created_at DESC, id DESC LIMIT ?
+        ''', (status, limit + 1))
+    messages = cursor.fetchall()
+    next_cursor = encode_cursor(messages[limit - 1]) if len(messages) > limit else None
+    return messages[:limit], next_cursor
+
+
+def parse_message_ids(values):
+    """Valid message ids (integers in SQLite's rowid range) from raw form values"""
+    ids = []
+    for value in values:
+        try:
+            message_id = int(value)
+        except (TypeError, ValueError):
+            continue
+        if 1 <= message_id <= MAX_ROWID:
+            ids.append(message_id)
+    return ids
+
+
+def set_status(conn, message_ids, status):
+    """Set status for many messages in a single UPDATE ... WHERE id IN (...) transaction.
+
+    Invalid ids are ignored; more than MAX_BULK ids raise ValueError.
+    """
+    if status not in STATUSES:
+        raise ValueError(f'unknown status: {status}')
+    ids = parse_message_ids(message_ids)
+    if len(ids) > MAX_BULK:
+        raise ValueError(f'at most {MAX_BULK} messages per request')
+    if not ids:
+        return 0
+    placeholders = ', '.join('?' for _ in ids)
+    cursor = conn.cursor()
+    cursor.execute(f'''
+        UPDATE contact_messages SET status = ?
+        WHERE id IN ({placeholders}) AND status IS NOT ?
+    ''', (status, *ids, status))
+    conn.commit()
+    return cursor.rowcount
+
+
+def archive_old_messages(conn, days=ARCHIVE_AFTER_DAYS):
+    """Move handled (read/archived) messages older than days into contact_messages_archive"""
+    cursor = conn.cursor()
+    cutoff = f'-{int(days)} days'
+    # Both statements run in one transaction (opened implicitly by the INSERT)
+    try:
+        cursor.execute('''
+            INSERT OR REPLACE INTO contact_messages_archive
+                (id, name, email, subject, message, status, created_at)
+            SELECT id, name, email, subject, message, status, created_at FROM contact_messages
+            WHERE status IN ('read', 'archived') AND created_at < datetime('now', ?)
+        ''', (cutoff,))
+        cursor.execute('''
+            DELETE FROM contact_messages
+            WHERE status IN ('read', 'archived') AND created_at < datetime('now', ?)
+        ''', (cutoff,))
+        moved = cursor.rowcount
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    return moved
+
+
+def main():
+    from main import DB_NAME
+
+    parser = argparse.ArgumentParser(description='Move old handled contact messages to the archive table')
+    parser.add_argument('--days', type=int, default=ARCHIVE_AFTER_DAYS)
+    args = parser.parse_args()
+    with sqlite3.connect(DB_NAME) as conn:
+        print(f"Archived {archive_old_messages(conn, args.days)} messages.")
+
+
+if __name__ == '__main__':
+    main()
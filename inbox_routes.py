@@ -0,0 +1,53 @@
+# Admin inbox routes for contact messages
+from flask import render_template, request, redirect, url_for, flash, session
+import sqlite3
+from inbox import STATUSES, MAX_BULK, parse_message_ids, list_messages, get_counters, set_status, archive_old_messages
+
+def register_inbox_routes(app, db_name):
+    """Register admin inbox routes"""
+
+    # Inbox pages are small indexed reads and must reflect bulk updates
+    # immediately, so they use the live database rather than the snapshot.
+
+    @app.route('/admin/inbox')
+    def admin_inbox():
+        if not session.get('admin_logged_in'):
+            return redirect(url_for('admin_login'))
+
+        status = request.args.get('status', 'unread')
+        if status not in STATUSES:
+            status = 'unread'
+        with sqlite3.connect(db_name) as conn:
+            messages, next_cursor = list_messages(conn, status, after=request.args.get('after'))
+            counters = get_counters(conn)
+
+        return render_template('admin_inbox.html', messages=messages, status=status,
+                             next_cursor=next_cursor, counters=counters)
+
+    @app.route('/admin/inbox/bulk', methods=['POST'])
+    def admin_inbox_bulk():
+        if not session.get('admin_logged_in'):
+            return redirect(url_for('admin_login'))
+
+        status = request.form.get('action')
+        ids = parse_message_ids(request.form.getlist('ids'))
+        if status not in STATUSES or not ids:
+            flash('لطفاً پیام‌ها و عملیات را انتخاب کنید', 'error')
+        elif len(ids) > MAX_BULK:
+            flash(f'حداکثر {MAX_BULK} پیام را می‌توان یک‌جا به‌روزرسانی کرد', 'error')
+        else:
+            with sqlite3.connect(db_name) as conn:
+                updated = set_status(conn, ids, status)
+            flash(f'وضعیت {updated} پیام به‌روزرسانی شد', 'success')
+
+        return redirect(url_for('admin_inbox', status=request.form.get('current_status', 'unread')))
+
+    @app.route('/admin/inbox/archive-old', methods=['POST'])
+    def admin_inbox_archive_old():
+        if not session.get('admin_logged_in'):
+            return redirect(url_for('admin_login'))
+
+        with sqlite3.connect(db_name) as conn:
+            moved = archive_old_messages(conn)
+        flash(f'{moved} پیام قدیمی به بایگانی منتقل شد', 'success')
+        return redirect(url_for('admin_inbox', status='archived'))
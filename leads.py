@@ -0,0 +1,329 @@
+# Lead (legacy students table) normalization, deduplication and bulk import
+import argparse
+import csv
+import os
+import re
+import sqlite3
+import threading
+from datetime import datetime
+
+from catalog import jalali_to_gregorian
+
+BATCH_SIZE = 5000
+
+PERSIAN_DIGITS = str.maketrans('۰۱۲۳۴۵۶۷۸۹٠١٢٣٤٥٦٧٨٩', '01234567890123456789')
+
+# 2024-09-22, 2024-09-22 14:05:09(.ffffff), 2024-09-22T14:05, 1403/07/01 ...
+TIMESTAMP_RE = re.compile(r'(\d{4})[-/](\d{1,2})[-/](\d{1,2})(?:[ T](\d{1,2}):(\d{2})(?::(\d{2}))?)?')
+TIMESTAMP_FORMAT = '%Y-%m-%d %H:%M:%S'  # what CURRENT_TIMESTAMP stores
+
+# Merge on normalized email: the latest submission wins for contact details,
+# the earliest created_at is kept and submissions counts the repeats.
+UPSERT_SQL = '''
+    INSERT INTO students (name, email, phone, mode, created_at, email_norm, phone_norm,
+                          user_id, submissions, updated_at)
+    VALUES (?, ?, ?, ?, COALESCE(?, CURRENT_TIMESTAMP), ?, ?,
+            (SELECT id FROM users WHERE lower(trim(email)) = ?), 1, CURRENT_TIMESTAMP)
+    ON CONFLICT(email_norm) DO UPDATE SET
+        name = COALESCE(NULLIF(excluded.name, ''), students.name),
+        email = excluded.email,
+        phone = COALESCE(NULLIF(excluded.phone, ''), students.phone),
+        phone_norm = COALESCE(excluded.phone_norm, students.phone_norm),
+        mode = COALESCE(NULLIF(excluded.mode, ''), students.mode),
+        created_at = MIN(students.created_at, excluded.created_at),
+        user_id = COALESCE(students.user_id, excluded.user_id),
+        submissions = students.submissions + 1,
+        updated_at = CURRENT_TIMESTAMP
+'''
+
+# Users created (email/password or Google) after their lead was captured
+LINK_TRIGGERS = '''
+    CREATE TRIGGER IF NOT EXISTS trg_users_link_leads AFTER INSERT ON users
+    BEGIN
+        UPDATE students SET user_id = NEW.id
+        WHERE email_norm = lower(trim(NEW.email)) AND user_id IS NULL;
+    END;
+
+    CREATE TRIGGER IF NOT EXISTS trg_users_link_leads_email AFTER UPDATE OF email ON users
+    BEGIN
+        UPDATE students SET user_id = NEW.id
+        WHERE email_norm = lower(trim(NEW.email)) AND user_id IS NULL;
+    END;
+'''
+
+
+def normalize_email(email):
+    if not email:
+        return None
+    email = email.strip().lower()
+    return email if '@' in email else None
+
+
+def normalize_phone(phone):
+    """Canonical Iranian mobile form (09xxxxxxxxx); other numbers keep their digits"""
+    if not phone:
+        return None
+    digits = re.sub(r'\D', '', phone.translate(PERSIAN_DIGITS))
+    if digits.startswith('0098'):
+        digits = '0' + digits[4:]
+    elif digits.startswith('98') and len(digits) == 12:
+        digits = '0' + digits[2:]
+    elif digits.startswith('9') and len(digits) == 10:
+        digits = '0' + digits
+    return digits or None
+
+
+def normalize_created_at(value):
+    """Canonical 'YYYY-MM-DD HH:MM:SS' for a Gregorian or Jalali date(time), or None.
+
+    Years before 1700 are read as Jalali (e.g. '1403/07/01'). Anything that is
+    not a valid date gives None, so the row gets the default CURRENT_TIMESTAMP
+    and sorts, merges and rolls up like every other row.
+    """
+    if not value:
+        return None
+    match = TIMESTAMP_RE.match(str(value).strip().translate(PERSIAN_DIGITS))
+    if not match:
+        return None
+    year, month, day = (int(part) for part in match.group(1, 2, 3))
+    hour, minute, second = (int(part or 0) for part in match.group(4, 5, 6))
+    try:
+        if year < 1700:
+            if not (1 <= month <= 12 and 1 <= day <= (31 if month <= 6 else 30)):
+                return None
+            year, month, day = jalali_to_gregorian(year, month, day)
+        return datetime(year, month, day, hour, minute, second).strftime(TIMESTAMP_FORMAT)
+    except ValueError:
+        return None
+
+
+def lead_params(name, email, phone, mode, created_at=None):
+    """Build the UPSERT_SQL parameters for one lead, or None if it has no usable email"""
+    email_norm = normalize_email(email)
+    if not email_norm:
+        return None
+    return ((name or '').strip(), email.strip(), (phone or '').strip(), (mode or '').strip(),
+            normalize_created_at(created_at), email_norm, normalize_phone(phone), email_norm)
+
+
+def upsert_lead(cursor, name, email, phone, mode, created_at=None):
+    params = lead_params(name, email, phone, mode, created_at)
+    if params is None:
+        raise ValueError('ایمیل نامعتبر است')
+    cursor.execute(UPSERT_SQL, params)
+
+
+def ensure_lead_schema(conn):
+    """Add normalized key columns to students, merge existing duplicates and index them"""
+    cursor = conn.cursor()
+    cursor.execute("PRAGMA table_info(students)")
+    columns = [column[1] for column in cursor.fetchall()]
+    if 'email_norm' not in columns:
+        cursor.execute("ALTER TABLE students ADD COLUMN email_norm TEXT")
+    if 'phone_norm' not in columns:
+        cursor.execute("ALTER TABLE students ADD COLUMN phone_norm TEXT")
+    if 'user_id' not in columns:
+        cursor.execute("ALTER TABLE students ADD COLUMN user_id INTEGER REFERENCES users(id)")
+    if 'submissions' not in columns:
+        cursor.execute("ALTER TABLE students ADD COLUMN submissions INTEGER DEFAULT 1")
+    if 'updated_at' not in columns:
+        cursor.execute("ALTER TABLE students ADD COLUMN updated_at TIMESTAMP")
+
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_users_email_norm ON users(lower(trim(email)))")
+
+    cursor.execute("SELECT name FROM sqlite_master WHERE type = 'index' AND name = 'idx_students_email_norm'")
+    if cursor.fetchone() is None:
+        backfill_normalized_keys(conn)
+        dedupe_students(conn)
+        cursor.execute("CREATE UNIQUE INDEX idx_students_email_norm ON students(email_norm)")
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_students_phone_norm ON students(phone_norm)")
+    # Triggers link new users from now on; the pass catches users created before they existed
+    conn.executescript(LINK_TRIGGERS)
+    link_leads_to_users(conn)
+    conn.commit()
+
+
+def backfill_normalized_keys(conn, batch_size=BATCH_SIZE):
+    """Fill email_norm/phone_norm for rows written before the columns existed"""
+    read = conn.cursor()
+    write = conn.cursor()
+    last_id = 0
+    while True:
+        read.execute('''
+            SELECT id, email, phone FROM students
+            WHERE id > ? AND email_norm IS NULL ORDER BY id LIMIT ?
+        ''', (last_id, batch_size))
+        rows = read.fetchall()
+        if not rows:
+            break
+        write.executemany('UPDATE students SET email_norm = ?, phone_norm = ? WHERE id = ?',
+                          [(normalize_email(r[1]) or r[1].strip().lower(), normalize_phone(r[2]), r[0])
+                           for r in rows])
+        last_id = rows[-1][0]
+
+
+def dedupe_students(conn):
+    """Collapse rows sharing an email_norm into the newest one; returns rows removed"""
+    cursor = conn.cursor()
+    cursor.execute('''
+        CREATE TEMP TABLE lead_groups AS
+        SELECT email_norm, MAX(id) AS keep_id, MIN(created_at) AS first_seen,
+               SUM(COALESCE(submissions, 1)) AS total
+        FROM students WHERE email_norm IS NOT NULL
+        GROUP BY email_norm HAVING COUNT(*) > 1
+    ''')
+    cursor.execute('''
+        UPDATE students SET
+            created_at = (SELECT first_seen FROM lead_groups WHERE keep_id = students.id),
+            submissions = (SELECT total FROM lead_groups WHERE keep_id = students.id)
+        WHERE id IN (SELECT keep_id FROM lead_groups)
+    ''')
+    cursor.execute('''
+        DELETE FROM students
+        WHERE email_norm IN (SELECT email_norm FROM lead_groups)
+          AND id NOT IN (SELECT keep_id FROM lead_groups)
+    ''')
+    removed = cursor.rowcount
+    cursor.execute('DROP TABLE lead_groups')
+    return removed
+
+
+def link_leads_to_users(conn):
+    cursor = conn.cursor()
+    cursor.execute('''
+        UPDATE students
+        SET user_id = (SELECT id FROM users WHERE lower(trim(users.email)) = students.email_norm)
+        WHERE user_id IS NULL
+          AND email_norm IN (SELECT lower(trim(email)) FROM users)
+    ''')
+    return cursor.rowcount
+
+
+def import_leads(db_name, fileobj, batch_size=BATCH_SIZE, progress=None):
+    """Stream leads from a CSV file object into students, one transaction per batch.
+
+    Accepts the /admin/export layout (Name, Email, Phone, Mode, Created At) or
+    lowercase headers. Only one batch is held in memory at a time.
+    """
+    stats = {'processed': 0, 'imported': 0, 'rejected': 0}
+    conn = sqlite3.connect(db_name, isolation_level=None)
+    try:
+        cursor = conn.cursor()
+        batch = []
+
+        def flush():
+            cursor.execute('BEGIN IMMEDIATE')
+            cursor.executemany(UPSERT_SQL, batch)
+            cursor.execute('COMMIT')
+            stats['imported'] += len(batch)
+            batch.clear()
+            if progress:
+                progress(stats)
+
+        reader = csv.DictReader(fileobj)
+        if reader.fieldnames:
+            reader.fieldnames = [(f or '').strip().lower().replace(' ', '_') for f in reader.fieldnames]
+        for row in reader:
+            stats['processed'] += 1
+            params = lead_params(row.get('name'), row.get('email'), row.get('phone'),
+                                 row.get('mode'), row.get('created_at') or None)
+            if params is None:
+                stats['rejected'] += 1
+                continue
+            batch.append(params)
+            if len(batch) >= batch_size:
+                flush()
+        if batch:
+            flush()
+
+        cursor.execute('BEGIN IMMEDIATE')
+        stats['linked'] = link_leads_to_users(conn)
+        cursor.execute('COMMIT')
+    finally:
+        conn.close()
+    return stats
+
+
+def ensure_import_jobs_table(conn):
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS lead_import_jobs (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            filename TEXT,
+            status TEXT DEFAULT 'queued',
+            processed INTEGER DEFAULT 0,
+            imported INTEGER DEFAULT 0,
+            rejected INTEGER DEFAULT 0,
+            error TEXT,
+            started_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            finished_at TIMESTAMP
+        )
+    ''')
+
+
+def start_import_job(db_name, path, filename):
+    """Run import_leads on a saved upload in a background thread; returns the job id"""
+    with sqlite3.connect(db_name) as conn:
+        cursor = conn.cursor()
+        cursor.execute("INSERT INTO lead_import_jobs (filename, status) VALUES (?, 'running')", (filename,))
+        job_id = cursor.lastrowid
+        conn.commit()
+
+    def update(**fields):
+        assignments = ', '.join(f"{key} = ?" for key in fields)
+        with sqlite3.connect(db_name) as conn:
+            conn.execute(f"UPDATE lead_import_jobs SET {assignments} WHERE id = ?", (*fields.values(), job_id))
+            conn.commit()
+
+    def progress(stats):
+        update(processed=stats['processed'], imported=stats['imported'], rejected=stats['rejected'])
+
+    def run():
+        try:
+            with open(path, newline='', encoding='utf-8-sig') as f:
+                stats = import_leads(db_name, f, progress=progress)
+            progress(stats)
+            update(status='done', finished_at=_now())
+        except Exception as e:
+            update(status='failed', error=str(e), finished_at=_now())
+        finally:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+    threading.Thread(target=run, name=f'lead-import-{job_id}', daemon=True).start()
+    return job_id
+
+
+def _now():
+    return datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+
+
+def main():
+    from main import DB_NAME
+
+    parser = argparse.ArgumentParser(description='Import and deduplicate leads in students.db')
+    sub = parser.add_subparsers(dest='command', required=True)
+    p_import = sub.add_parser('import', help='stream a CSV of leads into the students table')
+    p_import.add_argument('csv_path')
+    p_import.add_argument('--batch-size', type=int, default=BATCH_SIZE)
+    sub.add_parser('dedupe', help='merge duplicate leads and link them to user accounts')
+    args = parser.parse_args()
+
+    if args.command == 'import':
+        with open(args.csv_path, newline='', encoding='utf-8-sig') as f:
+            stats = import_leads(DB_NAME, f, batch_size=args.batch_size,
+                                 progress=lambda s: print(f"... {s['processed']} rows"))
+        print(f"Processed {stats['processed']} rows: {stats['imported']} imported/merged, "
+              f"{stats['rejected']} rejected, {stats['linked']} linked to users.")
+    else:
+        with sqlite3.connect(DB_NAME) as conn:
+            backfill_normalized_keys(conn)
+            removed = dedupe_students(conn)
+            linked = link_leads_to_users(conn)
+            conn.commit()
+        print(f"Removed {removed} duplicate leads, linked {linked} leads to users.")
+
+
+if __name__ == '__main__':
+    main()
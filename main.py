@@ -14,6 +14,17 @@ from dotenv import load_dotenv
 # Load environment variables
 load_dotenv()
 
+from oauth_client import PooledFlaskOAuth2App, get_oauth_metrics
+from leads import ensure_lead_schema, ensure_import_jobs_table, upsert_lead, start_import_job
+from analytics import ensure_analytics_schema, get_analytics, clamp_days
+from snapshot import connect_snapshot, snapshot_age, take_snapshot
+from catalog import (ensure_catalog_schema, set_course_start_date, sync_start_dates,
+                     get_catalog, courses_by_start_date)
+from search import ensure_search_schema
+from inbox import ensure_inbox_schema, get_counters
+from maintenance import ensure_maintenance_schema, start_maintenance_scheduler, recent_runs
+from streaming import stream_page
+
 app = Flask(__name__)
 app.wsgi_app = ProxyFix(app.wsgi_app, x_proto=1, x_host=1)
 app.secret_key = os.environ.get('SECRET_KEY', 'your_secret_key_here')  # Change this in production!
@@ -24,10 +35,11 @@ login_manager.init_app(app)
 login_manager.login_view = 'login'
 login_manager.login_message = 'لطفاً ابتدا وارد شوید'
 
-# OAuth setup
+# OAuth setup (pooled keep-alive client shared per worker, see oauth_client.py)
 oauth = OAuth(app)
 google = oauth.register(
     name='google',
+    client_cls=PooledFlaskOAuth2App,
     client_id=os.environ.get('GOOGLE_CLIENT_ID'),
     client_secret=os.environ.get('GOOGLE_CLIENT_SECRET'),
     server_metadata_url='https://accounts.google.com/.well-known/openid-configuration',
@@ -46,8 +58,10 @@ mail = Mail(app)
 
 # Database Configuration for Liara
 # If running on Liara (where /app/data exists), use the persistent disk.
-# Otherwise (local), use the current directory.
-if os.path.exists('/app/data'):
+# Otherwise (local), use the current directory. DB_FOLDER overrides both.
+if os.environ.get('DB_FOLDER'):
+    DB_FOLDER = os.environ['DB_FOLDER']
+elif os.path.exists('/app/data'):
     DB_FOLDER = '/app/data'
 else:
     DB_FOLDER = os.path.dirname(os.path.abspath(__file__))
@@ -58,6 +72,9 @@ def init_db():
     with sqlite3.connect(DB_NAME) as conn:
         cursor = conn.cursor()
         
+        # WAL (persistent in the file): readers, snapshots and streamed pages don't block writers
+        cursor.execute('PRAGMA journal_mode = WAL')
+        
         # Legacy students table (keep for admin reference)
         cursor.execute('''
             CREATE TABLE IF NOT EXISTS students (
@@ -172,23 +189,26 @@ def init_db():
         cursor.execute("UPDATE specializations SET duration_weeks = 20 WHERE track_code = 'LLM' AND duration_weeks IS NULL")
         cursor.execute("UPDATE specializations SET duration_weeks = 24 WHERE track_code = 'AI_ROBOTICS' AND duration_weeks IS NULL")
 
-        # Start dates logic (4 Bahman 1404, 2 per week)
+        # Typed start dates and catalog versioning
+        ensure_catalog_schema(conn)
+
+        # Start dates logic (4 Bahman 1404, 2 per week), as Jalali YYYYMMDD
         start_dates = [
-            ('ریاضیات پیشرفته و نظریه یادگیری آماری', '۴ بهمن ۱۴۰۴'),
-            ('مبانی نظری زبان‌شناسی محاسباتی', '۴ بهمن ۱۴۰۴'),
-            ('تحلیل ریاضی معماری ترنسفورمرها', '۱۱ بهمن ۱۴۰۴'),
-            ('نظریه مدل‌های مولد', '۱۱ بهمن ۱۴۰۴'),
-            ('سمینار پژوهشی NLP', '۱۸ بهمن ۱۴۰۴'),
-            ('مبانی پایتون و ساختمان داده‌ها', '۱۸ بهمن ۱۴۰۴'),
-            ('الگوریتم‌ها و تفکر محاسباتی', '۲۵ بهمن ۱۴۰۴'),
-            ('ریاضیات پایه AI و بهینه سازی', '۲۵ بهمن ۱۴۰۴'),
-            ('اصول یادگیری ماشین و عمیق', '۲ اسفند ۱۴۰۴'),
-            ('بینایی ماشین و مکانیزم‌های توجه', '۲ اسفند ۱۴۰۴'),
-            ('رباتیک و سیستم‌های هوشمند', '۹ اسفند ۱۴۰۴'),
-            ('زبان تخصصی هوش مصنوعی', '۹ اسفند ۱۴۰۴')
+            ('ریاضیات پیشرفته و نظریه یادگیری آماری', 14041104),
+            ('مبانی نظری زبان‌شناسی محاسباتی', 14041104),
+            ('تحلیل ریاضی معماری ترنسفورمرها', 14041111),
+            ('نظریه مدل‌های مولد', 14041111),
+            ('سمینار پژوهشی NLP', 14041118),
+            ('مبانی پایتون و ساختمان داده‌ها', 14041118),
+            ('الگوریتم‌ها و تفکر محاسباتی', 14041125),
+            ('ریاضیات پایه AI و بهینه سازی', 14041125),
+            ('اصول یادگیری ماشین و عمیق', 14041202),
+            ('بینایی ماشین و مکانیزم‌های توجه', 14041202),
+            ('رباتیک و سیستم‌های هوشمند', 14041209),
+            ('زبان تخصصی هوش مصنوعی', 14041209)
         ]
-        for title, date in start_dates:
-            cursor.execute("UPDATE courses SET start_date = ? WHERE title = ?", (date, title))
+        for title, jdate in start_dates:
+            set_course_start_date(cursor, 'title = ? AND start_date_j IS NULL', (title,), jdate)
 
         # Specific migration: Add "English for AI" course if missing
         cursor.execute("SELECT COUNT(*) FROM courses WHERE title = 'زبان تخصصی هوش مصنوعی'")
@@ -230,6 +250,25 @@ def init_db():
             cursor.executemany('INSERT INTO courses (title, description, track, order_index, total_modules, price, duration_weeks, start_date) VALUES (?, ?, ?, ?, ?, ?, ?, ?)', courses_data)
             conn.commit()
 
+        sync_start_dates(cursor)
+        conn.commit()
+
+        # Lead dedup: normalized keys on students (merges existing duplicates once)
+        ensure_lead_schema(conn)
+        ensure_import_jobs_table(conn)
+        conn.commit()
+
+        # Analytics rollup tables, maintained by triggers
+        ensure_analytics_schema(conn)
+
+        # Full-text catalog search index, maintained by triggers
+        ensure_search_schema(conn)
+
+        # Admin inbox index, status counters and cold archive
+        ensure_inbox_schema(conn)
+
+        ensure_maintenance_schema(conn)
+
 init_db()
 
 # Common SEO Keywords
@@ -259,9 +298,19 @@ def load_user(user_id):
 # Register authentication and student routes
 from auth_routes import register_auth_routes
 from student_routes import register_student_routes
+from search_routes import register_search_routes
+from inbox_routes import register_inbox_routes
 
 register_auth_routes(app, DB_NAME, google)
 register_student_routes(app, DB_NAME)
+register_search_routes(app, DB_NAME, KEYWORDS)
+register_inbox_routes(app, DB_NAME)
+
+@app.before_request
+def start_background_jobs():
+    # Started on the first request so CLI scripts importing main don't spawn it;
+    # only the worker holding the maintenance lock actually runs maintenance.
+    start_maintenance_scheduler(DB_NAME)
 
 @app.route('/')
 def home():
@@ -272,36 +321,9 @@ def home():
 
 @app.route('/paths')
 def paths():
-    with sqlite3.connect(DB_NAME) as conn:
-        conn.row_factory = sqlite3.Row
-        cursor = conn.cursor()
-        
-        # Get all specializations
-        cursor.execute('SELECT * FROM specializations')
-        specs = cursor.fetchall()
-        
-        tracks = []
-        for spec in specs:
-            # Get courses for this track
-            cursor.execute('SELECT * FROM courses WHERE track = ? ORDER BY order_index', (spec['track_code'],))
-            track_courses = cursor.fetchall()
-            
-            # The start date of the track is the start date of its first course
-            track_start_date = track_courses[0]['start_date'] if track_courses else 'بزودی'
-            
-            tracks.append({
-                "title": spec['title'],
-                "desc": spec['description'],
-                "original_price": spec['original_price'],
-                "discounted_price": spec['discounted_price'],
-                "formatted_original": "{:,}".format(spec['original_price']),
-                "formatted_discounted": "{:,}".format(spec['discounted_price']),
-                "icon": spec['icon'],
-                "duration": spec['duration_weeks'],
-                "start_date": track_start_date,
-                "courses": track_courses
-            })
-            
+    # Formatted once per catalog version (see catalog.py)
+    tracks = get_catalog(DB_NAME)['tracks']
+
     return render_template('paths.html', tracks=tracks,
                          title="مسیرهای آموزشی",
                          description="مسیرهای تخصصی هوش مصنوعی و رباتیک با تخفیف ویژه ثبت‌نام کل دوره.",
@@ -309,22 +331,14 @@ def paths():
 
 @app.route('/courses')
 def courses():
-    with sqlite3.connect(DB_NAME) as conn:
-        conn.row_factory = sqlite3.Row
-        cursor = conn.cursor()
-        
-        # Get all individual courses
-        cursor.execute('SELECT * FROM courses ORDER BY track, order_index')
-        all_courses = cursor.fetchall()
-        
-        formatted_courses = []
-        for course in all_courses:
-            c_dict = dict(course)
-            c_dict['formatted_price'] = "{:,}".format(course['price'])
-            c_dict['duration'] = course['duration_weeks']
-            c_dict['start_date'] = course['start_date']
-            formatted_courses.append(c_dict)
-            
+    # ?sort=start orders by start date, ?upcoming=1 keeps only courses not yet started
+    if request.args.get('upcoming'):
+        formatted_courses = courses_by_start_date(DB_NAME, upcoming_from=datetime.now().date())
+    elif request.args.get('sort') == 'start':
+        formatted_courses = courses_by_start_date(DB_NAME)
+    else:
+        formatted_courses = get_catalog(DB_NAME)['courses']
+
     return render_template('courses.html', courses=formatted_courses,
                          title="دوره‌های آموزشی",
                          description="لیست کامل دوره‌های تخصصی هوش مصنوعی، یادگیری ماشین و رباتیک.",
@@ -381,8 +395,7 @@ def register():
         try:
             with sqlite3.connect(DB_NAME) as conn:
                 cursor = conn.cursor()
-                cursor.execute('INSERT INTO students (name, email, phone, mode) VALUES (?, ?, ?, ?)',
-                               (name, email, phone, mode))
+                upsert_lead(cursor, name, email, phone, mode)
                 conn.commit()
             flash('ثبت نام با موفقیت انجام شد! به زودی با شما تماس خواهیم گرفت.', 'success')
             return redirect(url_for('home'))
@@ -438,15 +451,74 @@ def admin_dashboard():
         return redirect(url_for('admin_login'))
     
     try:
+        # Import progress and the unread counter must be live; both are single-row lookups
         with sqlite3.connect(DB_NAME) as conn:
             conn.row_factory = sqlite3.Row
             cursor = conn.cursor()
-            cursor.execute('SELECT * FROM students ORDER BY created_at DESC')
-            students = cursor.fetchall()
-        return render_template('admin_dashboard.html', students=students)
+            cursor.execute('SELECT * FROM lead_import_jobs ORDER BY id DESC LIMIT 1')
+            import_job = cursor.fetchone()
+            unread_messages = get_counters(conn)['unread']
+        # Heavy admin reads go to the read-only snapshot, not the live database.
+        # The student list is streamed row by row; stream_page closes the connection.
+        conn = connect_snapshot(DB_NAME)
+        try:
+            conn.row_factory = sqlite3.Row
+            students = conn.execute('SELECT * FROM students ORDER BY created_at DESC')
+            return stream_page('admin_dashboard.html', conn=conn, students=students, import_job=import_job,
+                               snapshot_age=snapshot_age(DB_NAME), unread_messages=unread_messages)
+        except Exception:
+            conn.close()
+            raise
     except Exception as e:
         flash(f'خطا در بارگذاری داده‌ها: {e}', 'error')
-        return render_template('admin_dashboard.html', students=[])
+        return render_template('admin_dashboard.html', students=[], import_job=None,
+                               snapshot_age=None, unread_messages=0)
+
+@app.route('/admin/snapshot', methods=['GET', 'POST'])
+def admin_snapshot():
+    if not session.get('admin_logged_in'):
+        return redirect(url_for('admin_login'))
+
+    if request.method == 'POST':
+        take_snapshot(DB_NAME)
+        flash('نسخه خواندنی پایگاه داده به‌روزرسانی شد', 'success')
+        return redirect(url_for('admin_dashboard'))
+    age = snapshot_age(DB_NAME)
+    return {'age_seconds': round(age, 1) if age is not None else None}
+
+@app.route('/admin/import', methods=['POST'])
+def admin_import_leads():
+    if not session.get('admin_logged_in'):
+        return redirect(url_for('admin_login'))
+
+    upload = request.files.get('file')
+    if not upload or not upload.filename:
+        flash('لطفاً یک فایل CSV انتخاب کنید', 'error')
+        return redirect(url_for('admin_dashboard'))
+
+    # Save to the data volume so the background import streams from disk
+    import_dir = os.path.join(DB_FOLDER, 'imports')
+    os.makedirs(import_dir, exist_ok=True)
+    path = os.path.join(import_dir, f"{datetime.now().strftime('%Y%m%d%H%M%S%f')}.csv")
+    upload.save(path)
+
+    job_id = start_import_job(DB_NAME, path, upload.filename)
+    flash(f'درون‌ریزی فایل در پس‌زمینه آغاز شد (شماره {job_id})', 'success')
+    return redirect(url_for('admin_dashboard'))
+
+@app.route('/admin/import/<int:job_id>')
+def admin_import_status(job_id):
+    if not session.get('admin_logged_in'):
+        return redirect(url_for('admin_login'))
+
+    with sqlite3.connect(DB_NAME) as conn:
+        conn.row_factory = sqlite3.Row
+        cursor = conn.cursor()
+        cursor.execute('SELECT * FROM lead_import_jobs WHERE id = ?', (job_id,))
+        job = cursor.fetchone()
+    if not job:
+        return {'error': 'not found'}, 404
+    return dict(job)
 
 @app.route('/admin/export')
 def admin_export_csv():
@@ -454,7 +526,7 @@ def admin_export_csv():
         return redirect(url_for('admin_login'))
     
     try:
-        with sqlite3.connect(DB_NAME) as conn:
+        with connect_snapshot(DB_NAME) as conn:
             conn.row_factory = sqlite3.Row
             cursor = conn.cursor()
             cursor.execute('SELECT * FROM students ORDER BY created_at DESC')
@@ -478,6 +550,30 @@ def admin_export_csv():
         flash(f'خطا در ایجاد فایل CSV: {e}', 'error')
         return redirect(url_for('admin_dashboard'))
 
+@app.route('/admin/analytics')
+def admin_analytics():
+    if not session.get('admin_logged_in'):
+        return redirect(url_for('admin_login'))
+
+    days = clamp_days(request.args.get('days', 30, type=int))
+    with connect_snapshot(DB_NAME) as conn:
+        stats = get_analytics(conn, days=days)
+    return render_template('admin_analytics.html', days=days, snapshot_age=snapshot_age(DB_NAME), **stats)
+
+@app.route('/admin/maintenance')
+def admin_maintenance():
+    if not session.get('admin_logged_in'):
+        return redirect(url_for('admin_login'))
+
+    with sqlite3.connect(DB_NAME) as conn:
+        return {'runs': recent_runs(conn)}
+
+@app.route('/admin/metrics/oauth')
+def admin_oauth_metrics():
+    if not session.get('admin_logged_in'):
+        return redirect(url_for('admin_login'))
+    return get_oauth_metrics()
+
 @app.route('/admin/logout')
 def admin_logout():
     session.pop('admin_logged_in', None)
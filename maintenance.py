@@ -0,0 +1,215 @@
+# Scheduled SQLite maintenance for students.db
+#
+# One pass runs PRAGMA optimize, a WAL checkpoint, incremental vacuum steps and
+# PRAGMA quick_check under a time budget, and records file size, freelist pages
+# and WAL size in maintenance_log so growth can be followed over time.
+#
+# It runs either from cron (python maintenance.py) or in the web app, where
+# start_maintenance_scheduler() lets exactly one worker (the holder of a file
+# lock) run it every MAINTENANCE_INTERVAL seconds.
+import argparse
+import json
+import os
+import sqlite3
+import threading
+import time
+
+try:
+    import fcntl
+except ImportError:  # non-POSIX dev machines: no in-app election, use the CLI
+    fcntl = None
+
+MAINTENANCE_INTERVAL = int(os.environ.get('MAINTENANCE_INTERVAL', 6 * 3600))  # seconds
+MAINTENANCE_BUDGET = float(os.environ.get('MAINTENANCE_BUDGET', 30))  # seconds per run
+WAL_TRUNCATE_BYTES = int(os.environ.get('WAL_TRUNCATE_BYTES', 16 * 1024 * 1024))
+VACUUM_STEP_PAGES = 256
+
+_scheduler_started = False
+
+
+def ensure_maintenance_schema(conn):
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS maintenance_log (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            ran_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            duration_ms INTEGER,
+            db_bytes INTEGER,
+            wal_bytes INTEGER,
+            page_count INTEGER,
+            freelist_pages INTEGER,
+            quick_check TEXT,
+            steps TEXT
+        )
+    ''')
+    conn.commit()
+
+
+def _file_size(path):
+    try:
+        return os.path.getsize(path)
+    except OSError:
+        return 0
+
+
+def _pragma(conn, name):
+    return conn.execute(f'PRAGMA {name}').fetchone()[0]
+
+
+def database_stats(conn, db_name):
+    return {
+        'db_bytes': _file_size(db_name),
+        'wal_bytes': _file_size(db_name + '-wal'),
+        'page_size': _pragma(conn, 'page_size'),
+        'page_count': _pragma(conn, 'page_count'),
+        'freelist_pages': _pragma(conn, 'freelist_count'),
+        'journal_mode': _pragma(conn, 'journal_mode'),
+        'auto_vacuum': {0: 'none', 1: 'full', 2: 'incremental'}.get(_pragma(conn, 'auto_vacuum')),
+    }
+
+
+def enable_incremental_vacuum(db_name):
+    """Switch the file to auto_vacuum=INCREMENTAL; needs one full VACUUM (blocks writers)"""
+    with sqlite3.connect(db_name, timeout=30) as conn:
+        if _pragma(conn, 'auto_vacuum') != 2:
+            conn.execute('PRAGMA auto_vacuum = INCREMENTAL')
+            conn.execute('VACUUM')
+
+
+def run_maintenance(db_name, budget=MAINTENANCE_BUDGET):
+    """One maintenance pass; steps that do not fit in the budget are skipped or interrupted"""
+    start = time.monotonic()
+    deadline = start + budget
+    steps = {}
+
+    conn = sqlite3.connect(db_name, timeout=5, isolation_level=None)
+    # Abort any long-running statement once the budget is spent
+    conn.set_progress_handler(lambda: 1 if time.monotonic() > deadline else 0, 10000)
+    try:
+        def step(name, fn):
+            if time.monotonic() > deadline:
+                steps[name] = 'skipped'
+                return None
+            t = time.monotonic()
+            try:
+                result = fn()
+                steps[name] = {'ms': round((time.monotonic() - t) * 1000), 'result': result}
+                return result
+            except sqlite3.OperationalError as e:
+                steps[name] = {'ms': round((time.monotonic() - t) * 1000), 'error': str(e)}
+                return None
+
+        # Planner statistics (bounded work per index)
+        def optimize():
+            conn.execute('PRAGMA analysis_limit = 400')
+            conn.execute('PRAGMA optimize')
+            return 'ok'
+        step('optimize', optimize)
+
+        # WAL checkpoint: passive normally, truncate once the WAL has grown large
+        if _pragma(conn, 'journal_mode') == 'wal':
+            mode = 'TRUNCATE' if _file_size(db_name + '-wal') > WAL_TRUNCATE_BYTES else 'PASSIVE'
+            step('checkpoint', lambda: {'mode': mode, 'busy_log_checkpointed': list(
+                conn.execute(f'PRAGMA wal_checkpoint({mode})').fetchone())})
+        else:
+            steps['checkpoint'] = 'not in WAL mode'
+
+        # Give free pages back to the filesystem a chunk at a time
+        if _pragma(conn, 'auto_vacuum') == 2:
+            def vacuum_steps():
+                before = _pragma(conn, 'freelist_count')
+                while time.monotonic() < deadline and _pragma(conn, 'freelist_count'):
+                    conn.execute(f'PRAGMA incremental_vacuum({VACUUM_STEP_PAGES})').fetchall()
+                return {'pages_freed': before - _pragma(conn, 'freelist_count')}
+            step('incremental_vacuum', vacuum_steps)
+        else:
+            steps['incremental_vacuum'] = 'auto_vacuum is not INCREMENTAL (run with --enable-incremental-vacuum)'
+
+        quick_check = step('quick_check', lambda: conn.execute('PRAGMA quick_check').fetchone()[0])
+        conn.set_progress_handler(None, 0)
+
+        stats = database_stats(conn, db_name)
+        stats['duration_ms'] = round((time.monotonic() - start) * 1000)
+        stats['quick_check'] = quick_check
+        stats['steps'] = steps
+        conn.execute('''
+            INSERT INTO maintenance_log
+                (duration_ms, db_bytes, wal_bytes, page_count, freelist_pages, quick_check, steps)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+        ''', (stats['duration_ms'], stats['db_bytes'], stats['wal_bytes'], stats['page_count'],
+              stats['freelist_pages'], quick_check, json.dumps(steps)))
+        if quick_check not in (None, 'ok'):
+            print(f"SQLite quick_check reported problems: {quick_check}")
+        return stats
+    finally:
+        conn.close()
+
+
+def recent_runs(conn, limit=30):
+    conn.row_factory = sqlite3.Row
+    cursor = conn.cursor()
+    cursor.execute('SELECT * FROM maintenance_log ORDER BY id DESC LIMIT ?', (limit,))
+    return [dict(row) for row in cursor.fetchall()]
+
+
+def _seconds_since_last_run(db_name):
+    with sqlite3.connect(db_name) as conn:
+        cursor = conn.cursor()
+        cursor.execute("SELECT (julianday('now') - julianday(MAX(ran_at))) * 86400 FROM maintenance_log")
+        elapsed = cursor.fetchone()[0]
+    return elapsed if elapsed is not None else float('inf')
+
+
+def start_maintenance_scheduler(db_name, interval=MAINTENANCE_INTERVAL):
+    """Start a daemon thread that runs maintenance if this worker wins the lock"""
+    global _scheduler_started
+    if _scheduler_started or fcntl is None or interval <= 0:
+        return
+    _scheduler_started = True
+
+    def loop():
+        lock_file = open(db_name + '.maintenance.lock', 'w')
+        leader = False
+        while True:
+            if not leader:
+                try:
+                    # Held for the life of the process; released if the worker dies
+                    fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                    leader = True
+                except OSError:
+                    pass
+            if leader:
+                try:
+                    if _seconds_since_last_run(db_name) >= interval:
+                        run_maintenance(db_name)
+                except Exception as e:
+                    print(f"Error during database maintenance: {e}")
+            time.sleep(min(interval, 300))
+
+    threading.Thread(target=loop, name='db-maintenance', daemon=True).start()
+
+
+def main():
+    from main import DB_NAME
+
+    parser = argparse.ArgumentParser(description='Run SQLite maintenance on students.db')
+    parser.add_argument('--budget', type=float, default=MAINTENANCE_BUDGET, help='time budget in seconds')
+    parser.add_argument('--enable-incremental-vacuum', action='store_true',
+                        help='switch to auto_vacuum=INCREMENTAL first (one full VACUUM)')
+    parser.add_argument('--report', action='store_true', help='print recent runs instead of running')
+    args = parser.parse_args()
+
+    if args.report:
+        with sqlite3.connect(DB_NAME) as conn:
+            for run in recent_runs(conn):
+                print(f"{run['ran_at']}  db={run['db_bytes']}B  wal={run['wal_bytes']}B  "
+                      f"free={run['freelist_pages']}p  check={run['quick_check']}  {run['duration_ms']}ms")
+        return
+
+    if args.enable_incremental_vacuum:
+        enable_incremental_vacuum(DB_NAME)
+    stats = run_maintenance(DB_NAME, budget=args.budget)
+    print(json.dumps(stats, indent=2, ensure_ascii=False))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,120 @@
+# Pooled HTTP client for outbound OAuth (Google) calls
+import os
+import time
+import threading
+import logging
+from urllib.parse import urlsplit
+
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from authlib.integrations.requests_client import OAuth2Session
+from authlib.integrations.flask_client import FlaskOAuth2App
+
+logger = logging.getLogger(__name__)
+
+# Tunables (env overridable)
+OAUTH_CONNECT_TIMEOUT = float(os.environ.get('OAUTH_CONNECT_TIMEOUT', 3.05))
+OAUTH_READ_TIMEOUT = float(os.environ.get('OAUTH_READ_TIMEOUT', 10))
+OAUTH_RETRIES = int(os.environ.get('OAUTH_RETRIES', 2))
+OAUTH_POOL_SIZE = int(os.environ.get('OAUTH_POOL_SIZE', 4))
+
+_adapter = None
+_adapter_pid = None
+_adapter_lock = threading.Lock()
+
+_metrics = {}
+_metrics_lock = threading.Lock()
+
+
+class _SharedAdapter(HTTPAdapter):
+    """HTTPAdapter whose connection pool outlives a single session"""
+
+    def close(self):
+        # Authlib opens and closes a session around every call; closing the
+        # adapter there would drop the pooled keep-alive connections.
+        pass
+
+
+def get_shared_adapter():
+    """Return this worker's pooled adapter, creating it after fork if needed"""
+    global _adapter, _adapter_pid
+    pid = os.getpid()
+    if _adapter is None or _adapter_pid != pid:
+        with _adapter_lock:
+            if _adapter is None or _adapter_pid != pid:
+                # Connection errors are retried for every method; read and
+                # status retries only for GET (the token POST is single-use).
+                retry = Retry(
+                    total=OAUTH_RETRIES,
+                    connect=OAUTH_RETRIES,
+                    read=OAUTH_RETRIES,
+                    status=OAUTH_RETRIES,
+                    backoff_factor=0.2,
+                    status_forcelist=(502, 503, 504),
+                    allowed_methods=frozenset(['GET']),
+                    raise_on_status=False,
+                )
+                _adapter = _SharedAdapter(
+                    pool_connections=OAUTH_POOL_SIZE,
+                    pool_maxsize=OAUTH_POOL_SIZE,
+                    max_retries=retry,
+                    pool_block=False,
+                )
+                _adapter_pid = pid
+    return _adapter
+
+
+def record_hop(method, url, elapsed_ms, status=None):
+    """Accumulate timing for one outbound hop (method + host + path)"""
+    parts = urlsplit(url)
+    hop = f"{method.upper()} {parts.netloc}{parts.path}"
+    with _metrics_lock:
+        stats = _metrics.setdefault(hop, {
+            'count': 0, 'errors': 0, 'total_ms': 0.0, 'max_ms': 0.0, 'last_ms': 0.0,
+        })
+        stats['count'] += 1
+        stats['total_ms'] += elapsed_ms
+        stats['last_ms'] = elapsed_ms
+        stats['max_ms'] = max(stats['max_ms'], elapsed_ms)
+        if status is None or status >= 400:
+            stats['errors'] += 1
+    logger.info('oauth hop %s -> %s in %.1f ms', hop, status, elapsed_ms)
+
+
+def get_oauth_metrics():
+    """Snapshot of per-hop timings for this worker"""
+    with _metrics_lock:
+        snapshot = {}
+        for hop, stats in _metrics.items():
+            row = dict(stats)
+            row['avg_ms'] = round(stats['total_ms'] / stats['count'], 1) if stats['count'] else 0.0
+            row['total_ms'] = round(stats['total_ms'], 1)
+            row['max_ms'] = round(stats['max_ms'], 1)
+            row['last_ms'] = round(stats['last_ms'], 1)
+            snapshot[hop] = row
+    return {'pid': os.getpid(), 'hops': snapshot}
+
+
+class PooledOAuth2Session(OAuth2Session):
+    """OAuth2Session that reuses the worker-wide pool and times each request"""
+
+    def __init__(self, *args, **kwargs):
+        kwargs.setdefault('default_timeout', (OAUTH_CONNECT_TIMEOUT, OAUTH_READ_TIMEOUT))
+        super().__init__(*args, **kwargs)
+        adapter = get_shared_adapter()
+        self.mount('https://', adapter)
+        self.mount('http://', adapter)
+
+    def request(self, method, url, *args, **kwargs):
+        start = time.perf_counter()
+        status = None
+        try:
+            resp = super().request(method, url, *args, **kwargs)
+            status = resp.status_code
+            return resp
+        finally:
+            record_hop(method, url, (time.perf_counter() - start) * 1000, status)
+
+
+class PooledFlaskOAuth2App(FlaskOAuth2App):
+    client_cls = PooledOAuth2Session
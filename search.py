@@ -0,0 +1,176 @@
+# Full-text catalog search (SQLite FTS5) with Persian normalization
+#
+# catalog_fts holds normalized copies of course and specialization titles and
+# descriptions. Triggers keep it in sync; the normalization runs in SQL (nested
+# replace() calls generated from PERSIAN_NORMALIZATION) so any connection that
+# writes the catalog keeps the index correct. Queries are normalized the same
+# way in Python.
+import difflib
+import re
+import sqlite3
+from functools import lru_cache
+
+PERSIAN_NORMALIZATION = [
+    ('ي', 'ی'), ('ى', 'ی'), ('ئ', 'ی'),
+    ('ك', 'ک'),
+    ('ة', 'ه'), ('ۀ', 'ه'),
+    ('أ', 'ا'), ('إ', 'ا'), ('ٱ', 'ا'),
+    ('ؤ', 'و'),
+    ('‌', ' '), ('‏', ''), ('ـ', ''),  # ZWNJ, RLM, tatweel
+    ('ً', ''), ('ٌ', ''), ('ٍ', ''), ('َ', ''),  # harakat
+    ('ُ', ''), ('ِ', ''), ('ّ', ''), ('ْ', ''),
+]
+
+# Courses and specializations share one index: rowid = id * 2 (+ 1 for specializations)
+SOURCES = {
+    'course': {'table': 'courses', 'offset': 0},
+    'specialization': {'table': 'specializations', 'offset': 1},
+}
+
+AUTOCOMPLETE_LIMIT = 8
+SEARCH_LIMIT = 30
+
+_TRANSLATION = str.maketrans({src: dst for src, dst in PERSIAN_NORMALIZATION})
+_TOKEN_RE = re.compile(r'\w+')
+
+
+def normalize_persian(text):
+    return (text or '').translate(_TRANSLATION).lower()
+
+
+def sql_normalize(expr):
+    """SQL expression applying PERSIAN_NORMALIZATION to expr"""
+    for src, dst in PERSIAN_NORMALIZATION:
+        expr = f"replace({expr}, '{src}', '{dst}')"
+    return f"lower({expr})"
+
+
+def _sync_triggers(kind):
+    table = SOURCES[kind]['table']
+    rowid = f"NEW.id * 2 + {SOURCES[kind]['offset']}"
+    old_rowid = f"OLD.id * 2 + {SOURCES[kind]['offset']}"
+    insert = f'''
+        INSERT INTO catalog_fts (rowid, title, description, kind, ref_id)
+        VALUES ({rowid}, {sql_normalize('NEW.title')}, {sql_normalize("COALESCE(NEW.description, '')")},
+                '{kind}', NEW.id);
+    '''
+    return [
+        f"CREATE TRIGGER IF NOT EXISTS trg_{table}_fts_insert AFTER INSERT ON {table} BEGIN {insert} END",
+        f'''CREATE TRIGGER IF NOT EXISTS trg_{table}_fts_update AFTER UPDATE OF title, description ON {table}
+            BEGIN DELETE FROM catalog_fts WHERE rowid = {old_rowid}; {insert} END''',
+        f'''CREATE TRIGGER IF NOT EXISTS trg_{table}_fts_delete AFTER DELETE ON {table}
+            BEGIN DELETE FROM catalog_fts WHERE rowid = {old_rowid}; END''',
+    ]
+
+
+def ensure_search_schema(conn):
+    """Create the FTS5 index and its sync triggers; fill it the first time"""
+    cursor = conn.cursor()
+    cursor.execute("SELECT name FROM sqlite_master WHERE name = 'catalog_fts'")
+    first_run = cursor.fetchone() is None
+    cursor.execute('''
+        CREATE VIRTUAL TABLE IF NOT EXISTS catalog_fts USING fts5(
+            title, description, kind UNINDEXED, ref_id UNINDEXED,
+            tokenize = 'unicode61 remove_diacritics 2'
+        )
+    ''')
+    cursor.execute("CREATE VIRTUAL TABLE IF NOT EXISTS catalog_fts_vocab USING fts5vocab(catalog_fts, row)")
+    for kind in SOURCES:
+        for statement in _sync_triggers(kind):
+            cursor.execute(statement)
+    if first_run:
+        rebuild_search_index(conn)
+    conn.commit()
+
+
+def rebuild_search_index(conn):
+    cursor = conn.cursor()
+    cursor.execute('DELETE FROM catalog_fts')
+    for kind, source in SOURCES.items():
+        cursor.execute(f'''
+            INSERT INTO catalog_fts (rowid, title, description, kind, ref_id)
+            SELECT id * 2 + {source['offset']}, {sql_normalize('title')},
+                   {sql_normalize("COALESCE(description, '')")}, '{kind}', id
+            FROM {source['table']}
+        ''')
+
+
+def _fts_query(terms, prefix_last):
+    quoted = ['"' + term.replace('"', '""') + '"' for term in terms]
+    if prefix_last and quoted:
+        quoted[-1] += '*'
+    return ' '.join(quoted)
+
+
+def _run(cursor, terms, prefix_last, limit):
+    cursor.execute('''
+        SELECT f.kind, f.ref_id,
+               COALESCE(c.title, s.title) AS title,
+               COALESCE(c.description, s.description) AS description,
+               COALESCE(c.track, s.track_code) AS track,
+               bm25(catalog_fts, 10.0, 1.0) AS rank
+        FROM catalog_fts f
+        LEFT JOIN courses c ON f.kind = 'course' AND c.id = f.ref_id
+        LEFT JOIN specializations s ON f.kind = 'specialization' AND s.id = f.ref_id
+        WHERE catalog_fts MATCH ?
+        ORDER BY rank
+        LIMIT ?
+    ''', (_fts_query(terms, prefix_last), limit))
+    return [dict(row) for row in cursor.fetchall()]
+
+
+def _vocabulary(cursor):
+    cursor.execute('SELECT term FROM catalog_fts_vocab')
+    return [row[0] for row in cursor.fetchall()]
+
+
+def _correct(terms, vocabulary, prefix_last):
+    """Replace unknown terms with their closest indexed term (typo tolerance)"""
+    known = set(vocabulary)
+    corrected = []
+    for i, term in enumerate(terms):
+        if prefix_last and i == len(terms) - 1:
+            # Compare a partial word against indexed words cut to the same length
+            candidates = sorted({word[:len(term)] for word in vocabulary})
+        elif term in known:
+            corrected.append(term)
+            continue
+        else:
+            candidates = vocabulary
+        match = difflib.get_close_matches(term, candidates, n=1, cutoff=0.75)
+        corrected.append(match[0] if match else term)
+    return corrected
+
+
+@lru_cache(maxsize=2048)
+def _cached_search(db_name, version, query, prefix, limit):
+    terms = _TOKEN_RE.findall(normalize_persian(query))
+    if not terms:
+        return ()
+    with sqlite3.connect(db_name) as conn:
+        conn.row_factory = sqlite3.Row
+        cursor = conn.cursor()
+        results = _run(cursor, terms, prefix, limit)
+        if not results:
+            corrected = _correct(terms, _vocabulary(cursor), prefix)
+            if corrected != terms:
+                results = _run(cursor, corrected, prefix, limit)
+    return tuple(results)
+
+
+def _catalog_version(db_name):
+    with sqlite3.connect(db_name) as conn:
+        cursor = conn.cursor()
+        cursor.execute('SELECT version FROM catalog_meta WHERE id = 1')
+        return cursor.fetchone()[0]
+
+
+def search_catalog(db_name, query, limit=SEARCH_LIMIT):
+    """Ranked results for a full query; typos fall back to the nearest indexed words"""
+    return list(_cached_search(db_name, _catalog_version(db_name), query.strip(), False, limit))
+
+
+def autocomplete(db_name, prefix, limit=AUTOCOMPLETE_LIMIT):
+    """Prefix matches for search-as-you-type; hot prefixes are served from the LRU cache"""
+    return [{'kind': r['kind'], 'id': r['ref_id'], 'title': r['title']}
+            for r in _cached_search(db_name, _catalog_version(db_name), prefix.strip(), True, limit)]
@@ -0,0 +1,32 @@
+# Catalog search routes
+from flask import render_template, request, jsonify, url_for
+from search import search_catalog, autocomplete
+
+def register_search_routes(app, db_name, keywords=''):
+    """Register catalog search page and autocomplete API"""
+
+    def result_url(kind, ref_id):
+        if kind == 'course':
+            return url_for('courses', _anchor=f'course-{ref_id}')
+        return url_for('paths')
+
+    @app.route('/search')
+    def search():
+        query = request.args.get('q', '').strip()
+        results = [dict(result, url=result_url(result['kind'], result['ref_id']))
+                   for result in (search_catalog(db_name, query) if query else [])]
+
+        return render_template('search.html', query=query, results=results,
+                             title="جستجو",
+                             description="جستجو در دوره‌ها و مسیرهای آموزشی هوشدان.",
+                             keywords=keywords)
+
+    @app.route('/api/search/autocomplete')
+    def search_autocomplete():
+        prefix = request.args.get('q', '').strip()
+        suggestions = [dict(suggestion, url=result_url(suggestion['kind'], suggestion['id']))
+                       for suggestion in (autocomplete(db_name, prefix) if prefix else [])]
+
+        response = jsonify(suggestions)
+        response.headers['Cache-Control'] = 'public, max-age=60'
+        return response
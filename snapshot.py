@@ -0,0 +1,126 @@
+# Read-only snapshots of students.db for admin reads, exports and backups
+#
+# Snapshots are produced with SQLite's online backup API into a temp file and
+# swapped in atomically, so admin queries never hold read transactions on the
+# live database and readers of the previous snapshot are not disturbed.
+#
+# Copying does not pause writers only because init_db() puts students.db in
+# WAL mode; in rollback-journal mode the copy holds a SHARED lock throughout.
+# A stale snapshot is refreshed in a background thread while requests keep
+# reading the previous copy.
+import argparse
+import os
+import sqlite3
+import threading
+import time
+from urllib.parse import quote
+
+try:
+    import fcntl
+except ImportError:  # non-POSIX dev machines: fall back to a per-process lock
+    fcntl = None
+
+SNAPSHOT_MAX_AGE = int(os.environ.get('SNAPSHOT_MAX_AGE', 300))  # seconds
+
+_local_lock = threading.Lock()
+_refresh_lock = threading.Lock()
+_refresh_thread = None
+
+
+def snapshot_path(db_name):
+    root, ext = os.path.splitext(db_name)
+    return f"{root}_snapshot{ext}"
+
+
+def backup_database(db_name, dest_path):
+    """Copy db_name to dest_path with the online backup API, replacing it atomically"""
+    tmp_path = dest_path + '.tmp'
+    if os.path.exists(tmp_path):
+        os.remove(tmp_path)
+    src = sqlite3.connect(db_name)
+    dst = sqlite3.connect(tmp_path)
+    try:
+        src.backup(dst)
+        # The copy inherits WAL mode from the source; make it a standalone file
+        dst.execute('PRAGMA journal_mode = DELETE')
+    finally:
+        dst.close()
+        src.close()
+    os.replace(tmp_path, dest_path)
+
+
+def snapshot_age(db_name):
+    """Seconds since the snapshot was taken, or None if there is none"""
+    try:
+        return time.time() - os.path.getmtime(snapshot_path(db_name))
+    except OSError:
+        return None
+
+
+def take_snapshot(db_name, max_age=None):
+    """Refresh the snapshot; with max_age, skip it if another worker just did"""
+    path = snapshot_path(db_name)
+    with _local_lock, open(path + '.lock', 'w') as lock_file:
+        if fcntl:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+        try:
+            age = snapshot_age(db_name)
+            if max_age is not None and age is not None and age <= max_age:
+                return False
+            backup_database(db_name, path)
+            return True
+        finally:
+            if fcntl:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+def refresh_snapshot_async(db_name, max_age=SNAPSHOT_MAX_AGE):
+    """Refresh the snapshot in a background thread unless one is already running"""
+    global _refresh_thread
+    with _refresh_lock:
+        if _refresh_thread is not None and _refresh_thread.is_alive():
+            return
+
+        def refresh():
+            try:
+                take_snapshot(db_name, max_age=max_age)
+            except Exception as e:
+                print(f"Error refreshing database snapshot: {e}")
+
+        _refresh_thread = threading.Thread(target=refresh, name='db-snapshot', daemon=True)
+        _refresh_thread.start()
+
+
+def connect_snapshot(db_name, max_age=SNAPSHOT_MAX_AGE):
+    """Open a read-only connection to the snapshot.
+
+    Only a missing snapshot is taken inside the request. A snapshot older than
+    max_age is still served while a background thread replaces it.
+    """
+    age = snapshot_age(db_name)
+    if age is None:
+        take_snapshot(db_name)
+    elif age > max_age:
+        refresh_snapshot_async(db_name, max_age=max_age)
+    # immutable: the file is only ever replaced, never modified in place
+    return sqlite3.connect(f"file:{quote(snapshot_path(db_name))}?mode=ro&immutable=1", uri=True)
+
+
+def main():
+    from main import DB_NAME
+
+    parser = argparse.ArgumentParser(description='Snapshot students.db for admin reads or backups')
+    parser.add_argument('--backup', metavar='PATH', help='write a consistent backup to PATH instead')
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    if args.backup:
+        backup_database(DB_NAME, args.backup)
+        print(f"Backup written to {args.backup} in {time.perf_counter() - start:.2f}s.")
+    else:
+        take_snapshot(DB_NAME)
+        print(f"Snapshot {snapshot_path(DB_NAME)} refreshed in {time.perf_counter() - start:.2f}s.")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,39 @@
+# Streamed page rendering
+#
+# stream_page() renders a template with Flask's stream_template so the
+# base.html head and nav reach the client before row sections are fetched.
+# Pass live sqlite3 cursors as context values: rows are pulled from SQLite as
+# the template loops over them, and the connection is closed when the
+# response finishes.
+import os
+from flask import current_app, get_flashed_messages, stream_template
+
+# Coalesce Jinja's many tiny output events into socket-sized writes
+STREAM_CHUNK_BYTES = int(os.environ.get('STREAM_CHUNK_BYTES', 4096))
+
+
+def _coalesce(chunks, size):
+    buffer, length = [], 0
+    for chunk in chunks:
+        buffer.append(chunk)
+        length += len(chunk)
+        if length >= size:
+            yield ''.join(buffer)
+            buffer, length = [], 0
+    if buffer:
+        yield ''.join(buffer)
+
+
+def stream_page(template_name, conn=None, **context):
+    """Stream template_name as the response, closing conn once the body is sent"""
+    # Pop flashed messages now: the session cookie is written before the body
+    # streams, so popping them during rendering would leave them in the session.
+    # Flask caches them on the request, so base.html still sees them.
+    get_flashed_messages(with_categories=True)
+
+    response = current_app.response_class(
+        _coalesce(stream_template(template_name, **context), STREAM_CHUNK_BYTES),
+        mimetype='text/html')
+    if conn is not None:
+        response.call_on_close(conn.close)
+    return response
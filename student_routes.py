@@ -1,8 +1,9 @@
 # Student dashboard and course management routes
-from flask import render_template, request, redirect, url_for, flash
+from flask import request, redirect, url_for, flash
 from flask_login import login_required, current_user
 import sqlite3
 from datetime import datetime
+from streaming import stream_page
 
 def register_student_routes(app, db_name):
     """Register student dashboard and course routes"""
@@ -10,12 +11,13 @@ def register_student_routes(app, db_name):
     @app.route('/dashboard')
     @login_required
     def dashboard():
-        with sqlite3.connect(db_name) as conn:
-            conn.row_factory = sqlite3.Row
-            cursor = conn.cursor()
-            
+        # Rows are streamed into the page; stream_page closes the connection
+        conn = sqlite3.connect(db_name)
+        conn.row_factory = sqlite3.Row
+        
+        try:
             # Get enrolled courses with progress
-            cursor.execute('''
+            enrolled_courses = conn.execute('''
                 SELECT c.*, e.enrolled_at,
                        COUNT(CASE WHEN cp.completed = 1 THEN 1 END) as completed_modules
                 FROM enrollments e
@@ -25,21 +27,22 @@ def register_student_routes(app, db_name):
                 GROUP BY c.id
                 ORDER BY e.enrolled_at DESC
             ''', (current_user.id,))
-            enrolled_courses = cursor.fetchall()
-            
+        
             # Get available courses (not enrolled)
-            cursor.execute('''
+            available_courses = conn.execute('''
                 SELECT c.* FROM courses c
                 WHERE c.id NOT IN (
                     SELECT course_id FROM enrollments WHERE user_id = ?
                 )
                 ORDER BY c.track, c.order_index
             ''', (current_user.id,))
-            available_courses = cursor.fetchall()
             
-        return render_template('dashboard.html', 
-                             enrolled_courses=enrolled_courses,
-                             available_courses=available_courses)
+            return stream_page('dashboard.html', conn=conn,
+                               enrolled_courses=enrolled_courses,
+                               available_courses=available_courses)
+        except Exception:
+            conn.close()
+            raise
     
     @app.route('/enroll/<int:course_id>', methods=['POST'])
     @login_required
@@ -77,30 +80,42 @@ def register_student_routes(app, db_name):
     @app.route('/course/<int:course_id>')
     @login_required
     def course_detail(course_id):
-        with sqlite3.connect(db_name) as conn:
-            conn.row_factory = sqlite3.Row
-            cursor = conn.cursor()
-            
+        conn = sqlite3.connect(db_name)
+        conn.row_factory = sqlite3.Row
+        cursor = conn.cursor()
+        
+        try:
             # Check enrollment
             cursor.execute('SELECT * FROM enrollments WHERE user_id = ? AND course_id = ?',
                          (current_user.id, course_id))
             if not cursor.fetchone():
+                conn.close()
                 flash('شما در این دوره ثبت نام نکرده‌اید', 'error')
                 return redirect(url_for('dashboard'))
-            
+        
             # Get course info
             cursor.execute('SELECT * FROM courses WHERE id = ?', (course_id,))
             course = cursor.fetchone()
-            
-            # Get progress
+        
+            # Progress summary up front, so the module list itself can stream
             cursor.execute('''
+                SELECT COUNT(*) FROM course_progress
+                WHERE user_id = ? AND course_id = ? AND completed = 1
+            ''', (current_user.id, course_id))
+            completed_count = cursor.fetchone()[0]
+        
+            # Get progress
+            progress = conn.execute('''
                 SELECT * FROM course_progress 
                 WHERE user_id = ? AND course_id = ?
                 ORDER BY module_number
             ''', (current_user.id, course_id))
-            progress = cursor.fetchall()
             
-        return render_template('course_detail.html', course=course, progress=progress)
+            return stream_page('course_detail.html', conn=conn, course=course, progress=progress,
+                               completed_count=completed_count)
+        except Exception:
+            conn.close()
+            raise
     
     @app.route('/course/<int:course_id>/module/<int:module_num>/complete', methods=['POST'])
     @login_required
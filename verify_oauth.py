@@ -0,0 +1,118 @@
+# Verify pooled OAuth client against a local mock OIDC provider
+import json
+import time
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit, parse_qs
+
+from flask import Flask, url_for
+from authlib.integrations.flask_client import OAuth
+from authlib.jose import JsonWebKey, jwt
+
+from oauth_client import PooledFlaskOAuth2App, get_oauth_metrics
+
+CLIENT_ID = 'mock-client'
+LOGINS = 5
+
+KEY = JsonWebKey.generate_key('RSA', 2048, is_private=True, options={'kid': 'mock'})
+connections = []
+
+
+class MockOIDCHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'  # keep-alive
+
+    def setup(self):
+        super().setup()
+        connections.append(self.client_address)
+
+    def log_message(self, *args):
+        pass
+
+    def _json(self, data):
+        body = json.dumps(data).encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        base = f"http://127.0.0.1:{self.server.server_port}"
+        if self.path == '/.well-known/openid-configuration':
+            self._json({
+                'issuer': base,
+                'authorization_endpoint': base + '/authorize',
+                'token_endpoint': base + '/token',
+                'jwks_uri': base + '/jwks',
+            })
+        elif self.path == '/jwks':
+            self._json({'keys': [KEY.as_dict(is_private=False)]})
+        else:
+            self.send_error(404)
+
+    def do_POST(self):
+        length = int(self.headers.get('Content-Length', 0))
+        form = parse_qs(self.rfile.read(length).decode())
+        # The mock encodes the nonce as the authorization code
+        nonce = form['code'][0]
+        now = int(time.time())
+        claims = {
+            'iss': f"http://127.0.0.1:{self.server.server_port}",
+            'aud': CLIENT_ID, 'sub': '42', 'email': 'mock@example.com', 'name': 'Mock',
+            'iat': now, 'exp': now + 300, 'nonce': nonce,
+        }
+        id_token = jwt.encode({'alg': 'RS256', 'kid': 'mock'}, claims, KEY).decode()
+        self._json({'access_token': 'at', 'token_type': 'Bearer', 'expires_in': 300, 'id_token': id_token})
+
+
+def verify():
+    server = ThreadingHTTPServer(('127.0.0.1', 0), MockOIDCHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    app = Flask(__name__)
+    app.secret_key = 'verify'
+    oauth = OAuth(app)
+    provider = oauth.register(
+        name='mock',
+        client_cls=PooledFlaskOAuth2App,
+        client_id=CLIENT_ID,
+        client_secret='secret',
+        server_metadata_url=f"http://127.0.0.1:{server.server_port}/.well-known/openid-configuration",
+        client_kwargs={'scope': 'openid email profile'}
+    )
+
+    @app.route('/login')
+    def login():
+        return provider.authorize_redirect(url_for('callback', _external=True))
+
+    @app.route('/callback')
+    def callback():
+        token = provider.authorize_access_token()
+        return token['userinfo']['email']
+
+    try:
+        with app.test_client() as client:
+            for _ in range(LOGINS):
+                location = client.get('/login').headers['Location']
+                params = parse_qs(urlsplit(location).query)
+                resp = client.get('/callback', query_string={
+                    'code': params['nonce'][0], 'state': params['state'][0],
+                })
+                if resp.status_code != 200 or resp.get_data(as_text=True) != 'mock@example.com':
+                    print(f"FAILURE: Login callback returned {resp.status_code}.")
+                    return
+        print(f"SUCCESS: Completed {LOGINS} logins against mock provider.")
+
+        if len(connections) == 1:
+            print("SUCCESS: All outbound calls reused a single TCP connection.")
+        else:
+            print(f"FAILURE: Expected 1 TCP connection, saw {len(connections)}.")
+
+        print("\nOutbound hop timings:")
+        for hop, stats in get_oauth_metrics()['hops'].items():
+            print(f" - {hop}: {stats['count']} calls, avg {stats['avg_ms']} ms, max {stats['max_ms']} ms")
+    finally:
+        server.shutdown()
+
+if __name__ == "__main__":
+    verify()